@@ -1,6 +1,7 @@
 import datetime
 import json
 import pathlib
+import time
 from typing import List, Set, Optional, Mapping
 
 import boto3
@@ -15,6 +16,7 @@ from dependency_utils import (
     ResourceDependency,
     CheckEnabledDependency,
 )
+from planner import TypeStats, save_stats, save_types
 
 ENABLE_GET = True
 
@@ -26,7 +28,8 @@ cc = boto_session.client("cloudcontrol", config=boto_config)
 
 def main(resource_types: Optional[List] = None, starts_with=None):
     if resource_types is None:
-        resource_types = list_all_resource_types()
+        resource_types = list(list_all_resource_types())
+        save_types(resource_types)  # so planner.py can plan for every type without calling AWS
     if starts_with:
         resource_types = [x for x in resource_types if x.startswith(starts_with)]
 
@@ -34,15 +37,27 @@ def main(resource_types: Optional[List] = None, starts_with=None):
     graph.add_resources(resource_types)
     graph.load_dependencies()
 
-    for chain_start in graph.root_nodes():
-        known_resources = {}
-        for resource_type in graph.walk(chain_start):
-            resources = __get_resources(resource_type, known_resources)
-            if resources is None:
-                break  # end the whole chain, we skipped this resource type
-            known_resources[resource_type] = resources
-            print(f"{resource_type}: {len(known_resources[resource_type])}")
-            write_resources_to_file(resource_type, known_resources[resource_type])
+    run_stats = {}  # {resource_type: TypeStats}, used by planner.py to estimate the next run
+    try:
+        for chain_start in graph.root_nodes():
+            known_resources = {}
+            for resource_type in graph.walk(chain_start):
+                # Only added to run_stats when complete, an interrupted type keeps the numbers of the previous run
+                stats = TypeStats()
+                type_start = time.perf_counter()
+                resources = __get_resources(resource_type, known_resources, stats)
+                if resources is None:
+                    break  # end the whole chain, we skipped this resource type
+                stats.resources = len(resources)
+                # dependency_seconds is recorded separately, it is not time spent on CloudControl calls
+                stats.seconds = time.perf_counter() - type_start - stats.dependency_seconds
+                run_stats[resource_type] = stats
+                known_resources[resource_type] = resources
+                print(f"{resource_type}: {len(known_resources[resource_type])}")
+                write_resources_to_file(resource_type, known_resources[resource_type])
+    finally:
+        # A long run can fail or be interrupted, keep what we measured so far
+        save_stats(run_stats)
 
 
 def list_all_resource_types() -> Set[str]:
@@ -65,16 +80,23 @@ def list_all_resource_types() -> Set[str]:
             yield from (x["TypeName"] for x in page["TypeSummaries"])
 
 
-def list_resources_for_type(resource_type: str, resource_model: Optional[Mapping] = None) -> List:
+def list_resources_for_type(
+    resource_type: str, resource_model: Optional[Mapping] = None, stats: Optional[TypeStats] = None
+) -> List:
     should_perform_get = ENABLE_GET and (resource_type not in EXCLUDES_GET)  # do at least one get if enabled
+    if stats is None:
+        stats = TypeStats()
+    stats.invocations += 1
     kwargs = {}
     if resource_model:
         kwargs["ResourceModel"] = json.dumps(resource_model)
 
     try:
         for page in cc.get_paginator("list_resources").paginate(TypeName=resource_type, **kwargs):
+            stats.list_calls += 1
             for description in page.get("ResourceDescriptions", []):  # AWS::IVS::StreamKey does not return this key
                 if should_perform_get:
+                    stats.get_calls += 1
                     properties = cc.get_resource(TypeName=resource_type, Identifier=description["Identifier"])[
                         "ResourceDescription"
                     ]["Properties"]
@@ -89,7 +111,7 @@ def list_resources_for_type(resource_type: str, resource_model: Optional[Mapping
                 yield description
     except cc.exceptions.UnsupportedActionException:
         # List not supported
-        pass
+        stats.list_calls += 1  # the failed call still counts
 
 
 def write_resources_to_file(resource_type: str, resources: list, metadata: Optional[Mapping] = None):
@@ -139,7 +161,15 @@ def create_model(parent_resource: Mapping, property_mapping: Mapping):
     return model
 
 
-def __get_resources(resource_type, known_resources) -> Optional[List]:
+def __call_dependency_function(dependency, stats: TypeStats):
+    start = time.perf_counter()
+    try:
+        return dependency.function(session=boto_session)
+    finally:
+        stats.dependency_seconds = time.perf_counter() - start
+
+
+def __get_resources(resource_type, known_resources, stats: TypeStats) -> Optional[List]:
     if resource_type in EXCLUDES:
         print(f"// {resource_type}: skipped")
         return None
@@ -147,18 +177,18 @@ def __get_resources(resource_type, known_resources) -> Optional[List]:
 
     if dependency is None:
         # We don't have to do anything special, we can list directly
-        return list(list_resources_for_type(resource_type))
+        return list(list_resources_for_type(resource_type, stats=stats))
 
     if isinstance(dependency, CheckEnabledDependency):
-        if dependency.function(session=boto_session):
-            return list(list_resources_for_type(resource_type))
+        if __call_dependency_function(dependency, stats):
+            return list(list_resources_for_type(resource_type, stats=stats))
         return []  # this does not count as skipped, but as not enabled
 
     if isinstance(dependency, ResourceDependency):
         parent_type = DEPENDENCIES[resource_type].parent  # always one parent
         parent_resources = known_resources[parent_type]
     elif isinstance(dependency, DynamicDependency):
-        parent_resources = dependency.function(session=boto_session)
+        parent_resources = __call_dependency_function(dependency, stats)
     elif isinstance(dependency, StaticDependency):
         parent_resources = dependency.items
     else:
@@ -169,7 +199,7 @@ def __get_resources(resource_type, known_resources) -> Optional[List]:
         # construct a parent_resource model for every parent parent_resource that exists
         model = create_model(resource, DEPENDENCIES[resource_type].mapping)
         # Get all resources for the particular parent
-        output.extend(list_resources_for_type(resource_type, model))
+        output.extend(list_resources_for_type(resource_type, model, stats))
     return output
 
 
@@ -0,0 +1,288 @@
+import argparse
+import dataclasses
+import json
+import pathlib
+from typing import Iterable, List, Mapping, Optional
+
+from config import EXCLUDES, EXCLUDES_GET, DEPENDENCIES
+from dependency_utils import (
+    DependencyGraph,
+    DynamicDependency,
+    StaticDependency,
+    ResourceDependency,
+    CheckEnabledDependency,
+)
+
+STATS_FILE = pathlib.Path("../stats.json")
+TYPES_FILE = pathlib.Path("../types.json")
+
+# Used when we have never seen a resource type before
+DEFAULT_SECONDS_PER_CALL = 0.5
+DEFAULT_RESOURCES_PER_INVOCATION = 1  # a lower bound that still lets us estimate the children
+DOMINANT_SHARE = 0.8  # flag the most expensive types that together make up this share of the time
+
+
+@dataclasses.dataclass
+class TypeStats:
+    """What a previous run did for a single resource type (in a single account/region).
+
+    seconds is wall time spent listing and getting, so it includes the backoff of the adaptive retries.
+    Throttling in a previous run makes seconds / calls look slower than the API latency actually is.
+    """
+
+    invocations: int = 0  # ListResources paginations, one per parent resource
+    list_calls: int = 0  # ListResources pages
+    get_calls: int = 0
+    resources: int = 0
+    seconds: float = 0.0
+    dependency_seconds: float = 0.0  # DynamicDependency and CheckEnabledDependency functions (STS, QuickSight, ...)
+
+    @property
+    def calls(self) -> int:
+        return self.list_calls + self.get_calls
+
+
+@dataclasses.dataclass
+class TypeEstimate:
+    resource_type: str
+    chain: str = ""  # the root node of the chain this type is listed in
+    invocations: float = 0
+    list_calls: float = 0
+    get_calls: float = 0
+    resources: float = 0
+    seconds: float = 0.0
+    skipped: bool = False
+    from_history: bool = False
+    unknown_parent: bool = False  # the parent is not part of the plan, main() would fail on this type
+    guessed_parent: bool = False  # the parent (or one of its ancestors) has no history, invocations is a guess
+    dominant: bool = False
+
+    @property
+    def calls(self) -> float:
+        return self.list_calls + self.get_calls
+
+
+@dataclasses.dataclass
+class Plan:
+    estimates: List[TypeEstimate]
+    accounts: int = 1
+    concurrency: int = 1
+    max_calls_per_second: Optional[float] = None
+
+    @property
+    def calls(self) -> float:
+        return self.accounts * sum(x.calls for x in self.estimates)
+
+    @property
+    def seconds(self) -> float:
+        return self.accounts * sum(x.seconds for x in self.estimates)
+
+    @property
+    def chain_seconds(self) -> float:
+        # Types in a chain are listed one after the other, so the slowest chain is a lower bound
+        chains = {}
+        for estimate in self.estimates:
+            chains[estimate.chain] = chains.get(estimate.chain, 0.0) + estimate.seconds
+        return max(chains.values(), default=0.0)
+
+    @property
+    def makespan(self) -> float:
+        bounds = [self.chain_seconds, self.seconds / self.concurrency]
+        if self.max_calls_per_second:
+            bounds.append(self.calls / self.max_calls_per_second)
+        return max(bounds)
+
+
+def load_stats(file: pathlib.Path = STATS_FILE) -> dict[str, TypeStats]:
+    if not file.exists():
+        return {}
+    with open(file) as fh:
+        return {resource_type: TypeStats(**values) for resource_type, values in json.load(fh).items()}
+
+
+def save_stats(stats: Mapping[str, TypeStats], file: pathlib.Path = STATS_FILE):
+    # Merge with what we already know, so a run for a subset of the types does not forget the others
+    merged = load_stats(file)
+    merged.update(stats)
+    with open(file, "w") as fh:
+        json.dump({k: dataclasses.asdict(v) for k, v in merged.items()}, fh, sort_keys=True, indent=2)
+
+
+def load_types(file: pathlib.Path = TYPES_FILE) -> List[str]:
+    if not file.exists():
+        return []
+    with open(file) as fh:
+        return json.load(fh)
+
+
+def save_types(resource_types: Iterable[str], file: pathlib.Path = TYPES_FILE):
+    with open(file, "w") as fh:
+        json.dump(sorted(resource_types), fh, indent=2)
+
+
+def known_types(history: Mapping[str, TypeStats]) -> set[str]:
+    """All types we know of without calling AWS: the cached type list, or previous runs and the configuration."""
+    cached = load_types()
+    if cached:
+        # This is what main() walks, the configuration also mentions types CloudControl can not list
+        return set(cached) | set(history)
+    types = set(history) | set(DEPENDENCIES) | set(EXCLUDES)
+    # Parents are usually not in DEPENDENCIES themselves, without them their children would become root nodes
+    types.update(x.parent for x in DEPENDENCIES.values() if isinstance(x, ResourceDependency))
+    return types
+
+
+def plan(
+    resource_types: Iterable[str],
+    history: Mapping[str, TypeStats],
+    accounts: int = 1,
+    concurrency: int = 1,
+    max_calls_per_second: Optional[float] = None,
+    enable_get: bool = True,
+) -> Plan:
+    graph = DependencyGraph(dependencies=DEPENDENCIES)
+    graph.add_resources(resource_types)
+    graph.load_dependencies()
+
+    estimates = []
+    for chain_start in graph.root_nodes():
+        known = {}
+        skip_rest = False
+        for resource_type in graph.walk(chain_start):
+            if resource_type in EXCLUDES:
+                skip_rest = True  # main() ends the whole chain on a skipped type
+            if skip_rest:
+                estimate = TypeEstimate(resource_type, chain=chain_start, skipped=True)
+            else:
+                estimate = _estimate_type(resource_type, chain_start, history, known, enable_get)
+            known[resource_type] = estimate
+            estimates.append(estimate)
+
+    result = Plan(estimates, accounts=accounts, concurrency=concurrency, max_calls_per_second=max_calls_per_second)
+    _flag_dominant(result.estimates)
+    return result
+
+
+def _estimate_type(resource_type, chain, history, known, enable_get) -> TypeEstimate:
+    estimate = TypeEstimate(resource_type, chain=chain)
+    previous = history.get(resource_type)
+    dependency = DEPENDENCIES.get(resource_type)
+
+    estimate.from_history = previous is not None
+
+    # How many times do we paginate over ListResources
+    if isinstance(dependency, ResourceDependency):
+        if dependency.parent in known:
+            parent = known[dependency.parent]
+            estimate.invocations = parent.resources
+            estimate.guessed_parent = not parent.from_history or parent.guessed_parent or parent.unknown_parent
+        elif dependency.parent in history:
+            estimate.invocations = history[dependency.parent].resources
+        else:
+            # main() would fail on this type, assume the parent has (at least) one resource
+            estimate.unknown_parent = True
+            estimate.from_history = False
+            estimate.invocations = DEFAULT_RESOURCES_PER_INVOCATION
+    elif isinstance(dependency, StaticDependency):
+        estimate.invocations = len(list(dependency.options))
+    elif isinstance(dependency, (DynamicDependency, CheckEnabledDependency)) and previous:
+        # the function returned the same for this account last time (0 invocations if CheckEnabled was disabled)
+        estimate.invocations = previous.invocations
+    else:
+        # no dependency, CheckEnabled (assume enabled) or a DynamicDependency we have never run
+        estimate.invocations = 1
+
+    if estimate.from_history and previous.invocations:
+        per_invocation = previous.resources / previous.invocations
+        estimate.list_calls = estimate.invocations * previous.list_calls / previous.invocations
+        estimate.get_calls = estimate.invocations * previous.get_calls / previous.invocations
+    else:
+        # We never listed this type (with a parent). Assume one page with one resource per invocation, a lower bound:
+        # GetResource is called for every resource until one matches the ListResources output, so once here.
+        per_invocation = DEFAULT_RESOURCES_PER_INVOCATION
+        estimate.list_calls = estimate.invocations
+        estimate.get_calls = estimate.invocations * DEFAULT_RESOURCES_PER_INVOCATION
+    estimate.resources = estimate.invocations * per_invocation
+
+    if not enable_get or resource_type in EXCLUDES_GET:
+        estimate.get_calls = 0
+
+    if previous and previous.calls:
+        seconds_per_call = previous.seconds / previous.calls
+    else:
+        seconds_per_call = DEFAULT_SECONDS_PER_CALL
+    estimate.seconds = estimate.calls * seconds_per_call
+    if previous:
+        estimate.seconds += previous.dependency_seconds  # the functions are cached, so called once per account
+    return estimate
+
+
+def _flag_dominant(estimates: List[TypeEstimate]):
+    total = sum(x.seconds for x in estimates)
+    if not total:
+        return
+    covered = 0.0
+    for estimate in sorted(estimates, key=lambda x: x.seconds, reverse=True):
+        if covered >= DOMINANT_SHARE * total:
+            break
+        estimate.dominant = True
+        covered += estimate.seconds
+
+
+def print_plan(result: Plan, show_all: bool = False):
+    total_seconds = result.seconds / result.accounts or 1
+    print(f"{'type':<60} {'lists':>8} {'gets':>8} {'resources':>10} {'seconds':>9} {'share':>6}")
+    for estimate in sorted(result.estimates, key=lambda x: x.seconds, reverse=True):
+        if not show_all and not estimate.dominant:
+            continue
+        if estimate.skipped:
+            print(f"// {estimate.resource_type}: skipped")
+            continue
+        flags = ("*" if estimate.dominant else "") + ("" if estimate.from_history else "?")
+        flags += "!" if estimate.unknown_parent else ""
+        flags += "~" if estimate.guessed_parent else ""
+        print(
+            f"{estimate.resource_type:<60} {estimate.list_calls:>8.0f} {estimate.get_calls:>8.0f}"
+            f" {estimate.resources:>10.0f} {estimate.seconds:>9.1f} {estimate.seconds / total_seconds:>6.1%} {flags}"
+        )
+    unknown = sum(1 for x in result.estimates if not x.skipped and not x.from_history)
+    unknown_parents = sum(1 for x in result.estimates if x.unknown_parent)
+    guessed_parents = sum(1 for x in result.estimates if x.guessed_parent)
+    print(f"* dominant, ? no previous run ({unknown} types), ! parent not planned ({unknown_parents} types)")
+    print(f"~ parent without previous run, fan-out is a guess ({guessed_parents} types)")
+    print(f"accounts: {result.accounts}, concurrency: {result.concurrency}")
+    print(f"calls: {result.calls:.0f}")
+    print(f"sequential: {result.seconds:.0f}s, slowest chain: {result.chain_seconds:.0f}s")
+    print(f"makespan: {result.makespan:.0f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate the API calls and duration of a sweep, without calling AWS")
+    parser.add_argument("--starts-with", default="AWS::")
+    parser.add_argument("--accounts", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--max-calls-per-second", type=float)
+    parser.add_argument("--no-get", action="store_true", help="Estimate as if ENABLE_GET was False")
+    parser.add_argument("--all", action="store_true", help="Show all types, not only the dominant ones")
+    parser.add_argument(
+        "--list-types", action="store_true", help=f"Refresh {TYPES_FILE} with CloudFormation ListTypes first"
+    )
+    args = parser.parse_args()
+
+    if args.list_types:
+        from index import list_all_resource_types  # only import (and create the boto3 clients) when needed
+
+        save_types(list_all_resource_types())
+    stats = load_stats()
+    types = [x for x in known_types(stats) if x.startswith(args.starts_with)]
+    print_plan(
+        plan(
+            types,
+            stats,
+            accounts=args.accounts,
+            concurrency=args.concurrency,
+            max_calls_per_second=args.max_calls_per_second,
+            enable_get=not args.no_get,
+        ),
+        show_all=args.all,
+    )